@@ -0,0 +1,605 @@
+import requests
+from urllib3.util import make_headers
+import os
+from urllib.parse import urlparse
+import json
+import csv
+import time
+import socket
+import ipaddress
+import threading
+import queue
+import itertools
+import collections
+import math
+import urllib3.util.connection
+import sys
+import contextlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Shared by multiple-website-link-fetcher.py and multiple-website-image-link-fetcher.py, keep it
+# next to them: the cached DNS resolver (importing this module routes every requests call
+# through it), the adaptive fetch/parse pipeline, the structured output writers and the link
+# checker. Page downloading and parsing stay in the scripts.
+
+try:
+    import dns.resolver as dns_resolver  # optional (pip install dnspython), resolves with record TTLs
+except ImportError:
+    dns_resolver = None
+
+try:
+    import pyarrow as pa  # optional (pip install pyarrow), only needed for Parquet output
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+REQUEST_TIMEOUT = 20
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'  # used by the link checker
+# only advertise encodings this install can decode: gzip/deflate always, br with the brotli
+# package and zstd with the zstandard package (pip install brotli zstandard)
+ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+MAX_BODY_BYTES = 10 * 1024 * 1024  # pages bigger than this (after decompression) are skipped
+BODY_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+FETCH_WORKERS = 8  # concurrent downloads to start with (I/O bound), tuned while running
+# parser processes (CPU bound, one per core); ProcessPoolExecutor allows at most 61 on windows
+PARSE_WORKERS = min(os.cpu_count() or 1, 61) if sys.platform == 'win32' else os.cpu_count() or 1
+PARSE_BACKLOG_PER_WORKER = 2  # downloaded pages allowed to wait for each parser
+MAX_FETCH_WORKERS = 64  # upper bound for the adaptive number of concurrent downloads
+MIN_REQUEST_TIMEOUT = 3  # per-host timeouts never go below this many seconds
+TIMEOUT_LATENCY_MULTIPLIER = 3  # per-host timeout = this x the host's 95th percentile fetch time
+MIN_LATENCY_SAMPLES = 5  # fetches of a host needed before its timeout is tuned
+LATENCY_SAMPLES_PER_HOST = 50
+HOST_FAILURE_LIMIT = 3  # consecutive timeouts/connection failures before a host is skipped
+MIN_AIMD_WINDOW = 30  # finished downloads between concurrency adjustments (at least), so one bad URL can't halve it
+CONGESTION_ERROR_RATE = 0.05  # concurrency is halved when more downloads than this fail
+SUMMARY_HOSTS = 5  # slowest hosts listed in the run summary
+DNS_CACHE_TTL = 300  # seconds to keep a lookup when the record TTL is unknown
+DNS_QUERY_TIMEOUT = 3  # seconds dnspython may spend on one A or AAAA query
+DNS_WORKERS = 32  # concurrent lookups when pre-resolving the hosts of the URL list
+DNS_NOT_FOUND_ERRORS = {socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)}
+HAPPY_EYEBALLS_DELAY = 0.25  # seconds before racing the next address of a host
+RESULT_FIELDS = ['link', 'source_url', 'text', 'tag', 'kind', 'status', 'fetched_at', 'fetch_seconds']
+OUTPUT_FORMATS = ('jsonl', 'csv', 'parquet')
+WRITE_BUFFER_SIZE = 1024 * 1024  # structured output is flushed to disk in chunks of this size
+PARQUET_ROW_GROUP_SIZE = 50000
+LINK_CHECK_WORKERS = 32  # concurrent liveness checks
+LINK_CHECK_PER_HOST = 4  # at most this many checks against one host at a time
+LINK_CHECK_FIELDS = ['link', 'alive', 'status', 'final_url', 'content_type', 'error']
+
+dns_cache = {}  # host -> (expires_at, [(family, ip), ...], error_message)
+link_check_cache = {}  # link -> check result, so each link is checked once per run
+link_check_local = threading.local()
+
+def query_address_records(host):
+    """
+    Look up the AAAA and A records of host with dnspython. Returns ([(family, ip), ...], ttl)
+    where ttl is the smallest record TTL, or ([], None) when neither query found anything.
+    """
+    addresses = []
+    ttls = []
+    for record_type, family in (('AAAA', socket.AF_INET6), ('A', socket.AF_INET)):
+        try:
+            answer = dns_resolver.resolve(host, record_type, lifetime=DNS_QUERY_TIMEOUT)
+        except dns_resolver.NXDOMAIN:
+            break  # the name doesn't exist, no point asking for the other record type
+        except Exception:
+            continue
+        ttls.append(answer.rrset.ttl)
+        addresses.extend((family, record.address) for record in answer)
+    return addresses, (min(ttls) if ttls else None)
+
+
+def resolve_host(host):
+    """
+    Resolve host through the in-process DNS cache. Returns (addresses, error_message) where
+    addresses is a list of (family, ip). With dnspython the addresses come from its A/AAAA
+    answers and are kept for the record TTL; without it (or for names it can't find, like
+    hosts file entries) getaddrinfo is used and answers are kept for DNS_CACHE_TTL. Hosts
+    that don't exist are cached too so every URL on a dead domain fails at once instead of
+    waiting for a connect timeout.
+    """
+    try:
+        ip = ipaddress.ip_address(host)
+        return [(socket.AF_INET6 if ip.version == 6 else socket.AF_INET, host)], None
+    except ValueError:
+        pass
+
+    now = time.monotonic()
+    cached = dns_cache.get(host)
+    if cached and cached[0] > now:
+        return cached[1], cached[2]
+
+    addresses, ttl = query_address_records(host) if dns_resolver is not None else ([], None)
+    if not addresses:
+        try:
+            addrinfo = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            error_message = f"Could not resolve host {host}: {e.strerror}"
+            if e.errno in DNS_NOT_FOUND_ERRORS:
+                dns_cache[host] = (now + DNS_CACHE_TTL, [], error_message)
+            return [], error_message
+
+        for family, _, _, _, sockaddr in addrinfo:
+            if (family, sockaddr[0]) not in addresses:
+                addresses.append((family, sockaddr[0]))
+
+    dns_cache[host] = (now + (ttl if ttl is not None else DNS_CACHE_TTL), addresses, None)
+    return addresses, None
+
+
+def pre_resolve_hosts(urls):
+    """
+    Resolve the hosts of all urls concurrently before fetching starts, filling the DNS cache.
+    Returns {host: error_message} for the hosts that don't exist (NXDOMAIN). Transient lookup
+    failures (SERVFAIL, EAI_AGAIN...) are not returned, the fetch resolves those hosts again.
+    """
+    hosts = {urlparse(url).hostname for url in urls} - {None}
+    failed_hosts = {}
+    with ThreadPoolExecutor(max_workers=DNS_WORKERS) as pool:
+        for host, (_, error_message) in zip(hosts, pool.map(resolve_host, hosts)):
+            # resolve_host only caches failures whose error is in DNS_NOT_FOUND_ERRORS
+            if error_message and host in dns_cache:
+                failed_hosts[host] = error_message
+    return failed_hosts
+
+
+def connect_happy_eyeballs(addresses, port, timeout, source_address, socket_options):
+    """
+    Connect to the first address that answers, happy eyeballs style (RFC 8305): address
+    families are interleaved, a new attempt starts every HAPPY_EYEBALLS_DELAY seconds (or
+    as soon as one fails) and the first connected socket wins, so a broken IPv6 route
+    doesn't cost a whole connect timeout.
+    """
+    ipv6 = [a for a in addresses if a[0] == socket.AF_INET6]
+    ipv4 = [a for a in addresses if a[0] != socket.AF_INET6]
+    first, second = (ipv6, ipv4) if addresses[0][0] == socket.AF_INET6 else (ipv4, ipv6)
+    ordered = [a for pair in itertools.zip_longest(first, second) for a in pair if a]
+
+    results = queue.Queue()
+
+    def attempt(family, ip):
+        sock = None
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            for option in socket_options or ():
+                sock.setsockopt(*option)
+            sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect((ip, port))
+            results.put((sock, None))
+        except OSError as e:
+            if sock is not None:
+                sock.close()
+            results.put((None, e))
+
+    started = finished = 0
+    last_error = None
+    winner = None
+    while finished < len(ordered):
+        if started < len(ordered):
+            threading.Thread(target=attempt, args=ordered[started], daemon=True).start()
+            started += 1
+        try:
+            sock, error = results.get(timeout=HAPPY_EYEBALLS_DELAY if started < len(ordered) else None)
+        except queue.Empty:
+            continue
+        finished += 1
+        if sock is not None:
+            winner = sock
+            break
+        last_error = error
+
+    def close_late_connections(pending):
+        for _ in range(pending):
+            sock, _ = results.get()
+            if sock is not None:
+                sock.close()
+
+    if started > finished:
+        threading.Thread(target=close_late_connections, args=(started - finished,), daemon=True).start()
+
+    if winner is None:
+        raise last_error
+    return winner
+
+
+def create_connection_with_dns_cache(address, timeout=None, source_address=None, socket_options=None):
+    """Drop-in replacement for urllib3's create_connection that uses the DNS cache."""
+    host, port = address
+    if host.startswith('['):
+        host = host.strip('[]')
+    if not isinstance(timeout, (int, float)):
+        timeout = socket.getdefaulttimeout()
+
+    addresses, error_message = resolve_host(host)
+    if error_message:
+        raise socket.gaierror(socket.EAI_NONAME, error_message)
+    return connect_happy_eyeballs(addresses, port, timeout, source_address, socket_options)
+
+
+# every requests call in the scripts importing this module goes through the cached resolver
+urllib3.util.connection.create_connection = create_connection_with_dns_cache
+
+
+def connection_failure_kind(error):
+    """
+    Classify a requests ConnectionError: 'dns' when the host name didn't resolve, 'refused'
+    when the host refused the connection and 'connection' for anything else (resets,
+    unreachable networks...). Only the last one says anything about network congestion.
+    """
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, socket.gaierror):
+            return 'dns'
+        if isinstance(current, ConnectionRefusedError):
+            return 'refused'
+        # requests wraps urllib3's MaxRetryError, which holds the real error in .reason
+        pending.extend([getattr(current, 'reason', None), current.__cause__, current.__context__])
+        pending.extend(arg for arg in getattr(current, 'args', ()) if isinstance(arg, BaseException))
+    return 'connection'
+
+
+def link_matches_pattern(link, text_pattern_to_search):
+    """Case-insensitive substring match. An empty pattern matches every link."""
+    if not text_pattern_to_search:
+        return True
+    return text_pattern_to_search.lower() in link.lower()
+
+
+class AdaptiveController:
+    """
+    Tunes the fetch pipeline from what it observes while it runs:
+
+    - per-host timeouts: TIMEOUT_LATENCY_MULTIPLIER x the host's 95th percentile fetch time,
+      kept between MIN_REQUEST_TIMEOUT and REQUEST_TIMEOUT (REQUEST_TIMEOUT until the host has
+      MIN_LATENCY_SAMPLES fetches). A host that times out, refuses connections or doesn't
+      resolve HOST_FAILURE_LIMIT times in a row is skipped for the rest of the run.
+    - global concurrency, AIMD style: after each window of finished downloads the number of
+      concurrent downloads grows by one while timeouts, connection errors and 429/503
+      answers stay under CONGESTION_ERROR_RATE, and is halved as soon as they don't. Lookup
+      failures and refused connections are problems of one host, not of the network, so
+      they don't count.
+
+    Only the thread driving the pipeline calls it, so it needs no locking.
+    """
+
+    def __init__(self, initial_concurrency=FETCH_WORKERS, max_concurrency=MAX_FETCH_WORKERS):
+        self.concurrency = min(initial_concurrency, max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.peak_concurrency = self.concurrency
+        self.increases = 0
+        self.decreases = 0
+        self.host_latencies = {}  # host -> deque of recent fetch times (seconds)
+        self.host_failures = {}   # host -> consecutive timeouts / connection failures
+        self.window_finished = 0
+        self.window_congested = 0
+        self.finished = 0
+        self.congested = 0
+
+    def timeout_for(self, url):
+        samples = self.host_latencies.get(urlparse(url).hostname)
+        if not samples or len(samples) < MIN_LATENCY_SAMPLES:
+            return REQUEST_TIMEOUT
+        ordered = sorted(samples)
+        p95 = ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+        return round(min(REQUEST_TIMEOUT, max(MIN_REQUEST_TIMEOUT, p95 * TIMEOUT_LATENCY_MULTIPLIER)), 1)
+
+    def should_skip(self, url):
+        return self.host_failures.get(urlparse(url).hostname, 0) >= HOST_FAILURE_LIMIT
+
+    def skip_message(self, url):
+        host = urlparse(url).hostname
+        return f"Skipped: {host} timed out or could not be connected to {self.host_failures[host]} times in a row"
+
+    def record(self, url, page):
+        """Feed back one finished download (the page dict from download_web_page)."""
+        host = urlparse(url).hostname
+        failure = page.get('failure')
+        congested = failure in ('timeout', 'connection') or page.get('status') in (429, 503)
+
+        if failure in ('timeout', 'connection', 'refused', 'dns'):
+            self.host_failures[host] = self.host_failures.get(host, 0) + 1
+        else:
+            self.host_failures[host] = 0
+            if page.get('fetch_seconds') is not None and not failure:
+                samples = self.host_latencies.setdefault(host, collections.deque(maxlen=LATENCY_SAMPLES_PER_HOST))
+                samples.append(page['fetch_seconds'])
+
+        self.finished += 1
+        self.window_finished += 1
+        if congested:
+            self.congested += 1
+            self.window_congested += 1
+
+        if self.window_finished >= max(MIN_AIMD_WINDOW, self.concurrency):
+            if self.window_congested / self.window_finished > CONGESTION_ERROR_RATE:
+                self.concurrency = max(1, self.concurrency // 2)
+                self.decreases += 1
+            elif self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self.increases += 1
+                self.peak_concurrency = max(self.peak_concurrency, self.concurrency)
+            self.window_finished = 0
+            self.window_congested = 0
+
+    def summary(self):
+        """Lines describing the controller's current decisions, for the end of run report."""
+        lines = [
+            f"Concurrent downloads: {self.concurrency} now, peak {self.peak_concurrency} "
+            f"({self.increases} increases, {self.decreases} decreases)",
+            f"Timeouts/connection errors/429/503: {self.congested} of {self.finished} downloads",
+        ]
+        # only hosts with a tuned timeout, the others are all still at REQUEST_TIMEOUT
+        timeouts = {host: self.timeout_for(f"http://{host}/") for host, samples in self.host_latencies.items()
+                    if len(samples) >= MIN_LATENCY_SAMPLES}
+        for host, timeout in sorted(timeouts.items(), key=lambda item: item[1], reverse=True)[:SUMMARY_HOSTS]:
+            lines.append(f"Timeout for {host}: {timeout}s")
+        skipped_hosts = [host for host, failures in self.host_failures.items() if failures >= HOST_FAILURE_LIMIT]
+        if skipped_hosts:
+            lines.append(f"Skipped unresponsive hosts: {', '.join(sorted(skipped_hosts))}")
+        return lines
+
+
+def start_parse_pool(parse_workers=PARSE_WORKERS):
+    """
+    Start the parser processes. They are spawned rather than forked (the default on Linux):
+    by the time pages are parsed the download and happy eyeballs threads are running, and
+    forking a multi-threaded process can deadlock the child.
+    """
+    return ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def fetch_and_parse_pages(urls, download, parse, parse_args=(), fetch_workers=FETCH_WORKERS, parse_workers=PARSE_WORKERS, controller=None, parse_pool=None):
+    """
+    Fetch many pages at once and yield (url, records, error_message) as each one finishes.
+    `download(url, timeout)` returns (page, error_message) like the scripts' download_web_page,
+    and `parse(content, base_url, *parse_args)` returns the records found on one page; each
+    record gets the page's source_url, status, fetched_at and fetch_seconds added. records
+    is None when the page failed.
+
+    Downloads run on a thread pool (I/O bound) and the raw bytes plus base URL are handed to
+    a process pool for parsing (CPU bound), so BeautifulSoup is not stuck on one core behind
+    the GIL. `parse` must therefore be a top-level function that only takes picklable
+    arguments. `urls` is consumed lazily and a new download only starts while the number of
+    pages in flight is below the current concurrency + PARSE_BACKLOG_PER_WORKER * parse_workers,
+    so memory stays bounded when the parsers fall behind.
+
+    The number of concurrent downloads (starting at fetch_workers) and each host's timeout are
+    tuned by `controller`, an AdaptiveController; pass one in to keep what it learned across
+    calls or to report its decisions afterwards. Likewise pass a pool from start_parse_pool
+    with parse_workers processes as `parse_pool` to reuse it across calls instead of starting one
+    per call.
+    """
+    if controller is None:
+        controller = AdaptiveController(fetch_workers)
+    parse_backlog = PARSE_BACKLOG_PER_WORKER * parse_workers
+    url_iter = iter(urls)
+    exhausted = False
+    fetching = {}  # download future -> url
+    parsing = {}   # parse future -> (url, page details without the content)
+
+    with ThreadPoolExecutor(max_workers=controller.max_concurrency) as fetch_pool, \
+         (contextlib.nullcontext(parse_pool) if parse_pool else start_parse_pool(parse_workers)) as parse_pool:
+        while True:
+            while not exhausted and len(fetching) < controller.concurrency and len(fetching) + len(parsing) < controller.concurrency + parse_backlog:
+                try:
+                    url = next(url_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if controller.should_skip(url):
+                    yield url, None, controller.skip_message(url)
+                    continue
+                fetching[fetch_pool.submit(download, url, controller.timeout_for(url))] = url
+
+            if not fetching and not parsing:
+                break
+
+            done, _ = wait(list(fetching) + list(parsing), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    url = fetching.pop(future)
+                    page, error_message = future.result()
+                    controller.record(url, page)
+                    if error_message:
+                        yield url, None, error_message
+                        continue
+                    content = page.pop('content')
+                    parsing[parse_pool.submit(parse, content, page['base_url'], *parse_args)] = (url, page)
+                else:
+                    url, page = parsing.pop(future)
+                    try:
+                        records = future.result()
+                    except Exception as e:
+                        yield url, None, f"An unexpected error occurred while processing {url}: {e}"
+                        continue
+                    for record in records:
+                        record['source_url'] = url
+                        record['status'] = page['status']
+                        record['fetched_at'] = page['fetched_at']
+                        record['fetch_seconds'] = page['fetch_seconds']
+                    yield url, records, None
+
+
+def get_link_check_session():
+    """One requests session per checker thread, so checks to the same host reuse connections."""
+    session = getattr(link_check_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        link_check_local.session = session
+    return session
+
+
+def check_link(link):
+    """
+    Check whether a link is alive with a HEAD request, falling back to a one-byte ranged GET
+    for servers that refuse or mishandle HEAD. Returns a dict with the link, 'alive', the
+    HTTP 'status', the 'final_url' after redirects, the 'content_type' and an 'error'
+    message. Results are memoized for the rest of the run.
+    """
+    cached = link_check_cache.get(link)
+    if cached is not None:
+        return cached
+
+    session = get_link_check_session()
+    try:
+        response = session.head(link, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+        if response.status_code >= 400:
+            # plenty of servers answer 403/404/405 to HEAD only, so confirm with a real GET
+            response = session.get(link, headers={'Range': 'bytes=0-0'}, timeout=REQUEST_TIMEOUT,
+                                   allow_redirects=True, stream=True)
+            response.close()
+        result = {
+            'link': link,
+            'alive': response.status_code < 400,
+            'status': response.status_code,
+            'final_url': response.url,
+            'content_type': response.headers.get('Content-Type', ''),
+            'error': None,
+        }
+    except requests.exceptions.RequestException as e:
+        result = {'link': link, 'alive': False, 'status': None, 'final_url': None, 'content_type': None, 'error': str(e)}
+
+    link_check_cache[link] = result
+    return result
+
+
+def check_links(links, workers=LINK_CHECK_WORKERS):
+    """
+    Check many links concurrently, at most LINK_CHECK_PER_HOST at a time per host. Links wait
+    in a queue per host and a host only gets a link handed to the pool while it has a free
+    slot, taking turns with the other hosts, so a long run of links to one host never holds
+    up the workers. Every distinct link is checked once per run. Returns {link: result}
+    (see check_link).
+    """
+    unique_links = list(dict.fromkeys(links))
+    waiting = {}  # host -> deque of links not handed out yet
+    for link in unique_links:
+        waiting.setdefault(urlparse(link).hostname, collections.deque()).append(link)
+    ready_hosts = collections.deque(waiting)  # hosts with waiting links and a free slot, in turn
+    active = collections.Counter()  # host -> checks running
+    running = {}  # future -> (host, link)
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while ready_hosts or running:
+            while ready_hosts and len(running) < workers:
+                host = ready_hosts.popleft()
+                link = waiting[host].popleft()
+                active[host] += 1
+                running[pool.submit(check_link, link)] = (host, link)
+                if waiting[host] and active[host] < LINK_CHECK_PER_HOST:
+                    ready_hosts.append(host)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                host, link = running.pop(future)
+                results[link] = future.result()
+                if waiting[host] and active[host] == LINK_CHECK_PER_HOST:
+                    ready_hosts.append(host)  # the host was full and just got a slot back
+                active[host] -= 1
+
+    return {link: results[link] for link in unique_links}
+
+
+def save_link_check_results_to_file(filename, check_results):
+    """Saves the link check results to a CSV file."""
+    try:
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=LINK_CHECK_FIELDS)
+            writer.writeheader()
+            writer.writerows(check_results.values())
+        return True, None
+    except Exception as e:
+        return False, f"Error saving link check results to {filename}: {e}"
+
+
+class JsonlResultWriter:
+    """Appends one JSON object per link to a .jsonl file."""
+
+    def __init__(self, filename):
+        self.file = open(filename, 'a', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+
+    def write(self, records):
+        for record in records:
+            self.file.write(json.dumps({field: record.get(field) for field in RESULT_FIELDS}, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class CsvResultWriter:
+    """Appends one row per link to a .csv file. The header is only written when the file is new."""
+
+    def __init__(self, filename):
+        is_new_file = not os.path.exists(filename) or os.path.getsize(filename) == 0
+        self.file = open(filename, 'a', encoding='utf-8', newline='', buffering=WRITE_BUFFER_SIZE)
+        self.writer = csv.DictWriter(self.file, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+        if is_new_file:
+            self.writer.writeheader()
+
+    def write(self, records):
+        self.writer.writerows(records)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultWriter:
+    """
+    Writes links to a .parquet file, one row group per PARQUET_ROW_GROUP_SIZE links.
+    Needs pyarrow. Parquet files can't be appended to, so an existing file is replaced.
+    """
+
+    def __init__(self, filename):
+        self.schema = pa.schema([
+            ('link', pa.string()),
+            ('source_url', pa.string()),
+            ('text', pa.string()),
+            ('tag', pa.string()),
+            ('kind', pa.string()),
+            ('status', pa.int32()),
+            ('fetched_at', pa.string()),
+            ('fetch_seconds', pa.float64()),
+        ])
+        self.writer = pq.ParquetWriter(filename, self.schema)
+        self.rows = []
+
+    def write(self, records):
+        self.rows.extend({field: record.get(field) for field in RESULT_FIELDS} for record in records)
+        if len(self.rows) >= PARQUET_ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def open_result_writer(filename, output_format):
+    """Opens a streaming writer for 'jsonl', 'csv' or 'parquet'. Returns (writer, error_message)."""
+    try:
+        if output_format == 'jsonl':
+            return JsonlResultWriter(filename), None
+        if output_format == 'csv':
+            return CsvResultWriter(filename), None
+        if output_format == 'parquet':
+            if pq is None:
+                return None, "Error: Parquet output needs pyarrow (pip install pyarrow)."
+            return ParquetResultWriter(filename), None
+        return None, f"Error: Unknown output format '{output_format}'."
+    except Exception as e:
+        return None, f"Error opening {filename} for writing: {e}"
\ No newline at end of file
@@ -1,64 +1,157 @@
-import msvcrt
 import requests
 import os
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import datetime
+import time
+from fetch_common import (
+    REQUEST_TIMEOUT, ACCEPT_ENCODING, MAX_BODY_BYTES, BODY_CHUNK_SIZE, HTML_CONTENT_TYPES,
+    FETCH_WORKERS, PARSE_WORKERS, OUTPUT_FORMATS, LINK_CHECK_WORKERS, LINK_CHECK_PER_HOST,
+    AdaptiveController, fetch_and_parse_pages, pre_resolve_hosts, connection_failure_kind,
+    link_matches_pattern, check_links, save_link_check_results_to_file, open_result_writer,
+)
+
+try:
+    import msvcrt  # windows only, used for "press any key"; the spawned parser processes import this script too
+except ImportError:
+    msvcrt = None
 
-REQUEST_TIMEOUT = 20
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+META_IMAGE_PROPERTIES = ('og:image', 'og:image:url', 'og:image:secure_url', 'twitter:image', 'twitter:image:src')  # meta tags that point at an image
+
+
+def download_web_page(url, timeout=REQUEST_TIMEOUT):
+    """
+    Downloads a single page. Returns (page, error) where page is a dict with the raw 'content',
+    the 'base_url' (final URL after redirects), the HTTP 'status', 'fetched_at' and 'fetch_seconds'.
+    On failure page only holds 'failure' (timeout, dns, refused, connection, http, skipped or other), 'status'
+    and 'fetch_seconds', for the AdaptiveController.
+    """
+    started = time.monotonic()
+    fetched_at = datetime.datetime.now().isoformat(timespec='seconds')
+
+    def failed(failure, status=None):
+        return {'failure': failure, 'status': status, 'fetch_seconds': round(time.monotonic() - started, 3)}
 
-def fetch_all_image_links(url, keyword):
-    """Fetches image URLs that contain the keyword from a web page, resolving relative links."""
-    links = set()
-    error_message = None
     try:
-        headers = {'User-Agent': USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-        base_url = response.url  # use the final URL as base for urljoin
-
-        # <img src="...">
-        for img_tag in soup.find_all('img', src=True):
-            src_url = img_tag['src'].strip()
-            if not src_url or src_url.lower().startswith(('javascript:', 'data:')):
-                continue
-            absolute_link = urljoin(base_url, src_url)
-            parsed = urlparse(absolute_link)
-            if parsed.scheme not in ('http', 'https'):
-                continue
-            normalized = parsed.geturl()
-            if keyword.lower() in normalized.lower():
-                links.add(normalized)
-
-        # also check for <source srcset> and img srcset (some responsive images)
-        for tag in soup.find_all(srcset=True):
-            srcset_value = tag.get('srcset', '')
-            # srcset can contain multiple candidates separated by commas
-            candidates = [c.strip().split(' ')[0] for c in srcset_value.split(',') if c.strip()]
-            for candidate in candidates:
-                absolute_link = urljoin(base_url, candidate)
-                parsed = urlparse(absolute_link)
-                if parsed.scheme not in ('http', 'https'):
-                    continue
-                normalized = parsed.geturl()
-                if keyword.lower() in normalized.lower():
-                    links.add(normalized)
-
-        links_list = sorted(links)
-        return links_list, None
+        headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING}
+        with requests.get(url, headers=headers, timeout=timeout, allow_redirects=True, stream=True) as response:
+            response.raise_for_status()
+
+            # decide from the headers alone, before any of the body is downloaded
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and content_type.split(';')[0].strip().lower() not in HTML_CONTENT_TYPES:
+                return failed('skipped', response.status_code), f"Skipped {url}: not an HTML page (Content-Type: {content_type})"
+            content_length = response.headers.get('Content-Length', '')
+            if content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+                return failed('skipped', response.status_code), f"Skipped {url}: larger than {MAX_BODY_BYTES} bytes ({content_length} bytes)"
+
+            # iter_content decompresses as it reads, so the size limit applies to the decoded page
+            chunks = []
+            body_size = 0
+            for chunk in response.iter_content(chunk_size=BODY_CHUNK_SIZE):
+                body_size += len(chunk)
+                if body_size > MAX_BODY_BYTES:
+                    return failed('skipped', response.status_code), f"Skipped {url}: larger than {MAX_BODY_BYTES} bytes"
+                chunks.append(chunk)
+
+            page = {
+                'content': b''.join(chunks),
+                'base_url': response.url,
+                'status': response.status_code,
+                'fetched_at': fetched_at,
+                'fetch_seconds': round(time.monotonic() - started, 3),
+            }
+            return page, None
 
     except requests.exceptions.Timeout:
-        return None, f"Timeout: {url}"
+        return failed('timeout'), f"Timeout: {url}"
     except requests.exceptions.RequestException as e:
         status = f"Status Code: {e.response.status_code}" if getattr(e, 'response', None) else "N/A"
-        return None, f"Error fetching {url}: {e} ({status})"
+        if isinstance(e, requests.exceptions.HTTPError) and e.response is not None:
+            page = failed('http', e.response.status_code)
+        elif isinstance(e, requests.exceptions.ConnectionError):
+            page = failed(connection_failure_kind(e))
+        else:
+            page = failed('other')
+        return page, f"Error fetching {url}: {e} ({status})"
+    except Exception as e:
+        return failed('other'), f"Unexpected error with {url}: {e}"
+
+
+def extract_image_records_from_html(content, base_url, keyword):
+    """
+    Parses raw page content in a single walk over the document and returns one record per
+    image URL that contains the keyword, sorted by link: {'link', 'text', 'tag', 'kind'}.
+    Images come from img src/srcset, <source> in a <picture>, video posters and
+    og:image/twitter:image meta tags; text is the alt text (or the meta property) of the
+    first tag that referenced the image. This runs inside the parser processes, so it has
+    to stay a plain top-level function that only takes picklable arguments.
+    """
+    records = {}
+
+    def add(raw_url, tag_name, text=''):
+        raw_url = raw_url.strip()
+        if not raw_url or raw_url.lower().startswith(('javascript:', 'data:')):
+            return
+        parsed = urlparse(urljoin(base_url, raw_url))
+        if parsed.scheme not in ('http', 'https'):
+            return
+        normalized = parsed.geturl()
+        if normalized not in records and link_matches_pattern(normalized, keyword):
+            records[normalized] = {'link': normalized, 'text': text, 'tag': tag_name, 'kind': 'image'}
+
+    soup = BeautifulSoup(content, 'html.parser')
+
+    for tag in soup.find_all(True):
+        name = tag.name
+
+        if name == 'img' and tag.get('src'):
+            add(tag['src'], name, tag.get('alt', '').strip())
+        elif name == 'source' and tag.get('src') and tag.parent is not None and tag.parent.name == 'picture':
+            add(tag['src'], name)
+        elif name == 'meta' and tag.get('content'):
+            meta_name = (tag.get('property') or tag.get('name') or '').lower()
+            if meta_name in META_IMAGE_PROPERTIES:
+                add(tag['content'], name, meta_name)
+
+        if name == 'video' and tag.get('poster'):
+            add(tag['poster'], name)
+        if tag.get('srcset'):
+            # srcset can contain multiple candidates separated by commas
+            for candidate in tag['srcset'].split(','):
+                if candidate.strip():
+                    add(candidate.strip().split(' ')[0], name, tag.get('alt', '').strip())
+
+    return [records[link] for link in sorted(records)]
+
+
+def extract_image_links_from_html(content, base_url, keyword):
+    """Parses raw page content and returns the sorted image URLs that contain the keyword."""
+    return [record['link'] for record in extract_image_records_from_html(content, base_url, keyword)]
+
+
+def fetch_all_image_links(url, keyword):
+    """Fetches image URLs that contain the keyword from a web page, resolving relative links."""
+    page, error = download_web_page(url)
+    if error:
+        return None, error
+    try:
+        return extract_image_links_from_html(page['content'], page['base_url'], keyword), None
     except Exception as e:
         return None, f"Unexpected error with {url}: {e}"
 
 
+def fetch_image_links_from_many_pages(urls, keyword, fetch_workers=FETCH_WORKERS, parse_workers=PARSE_WORKERS, controller=None):
+    """
+    Fetches many pages concurrently and yields (url, image_records, error) as each one finishes.
+    Each record is a dict with the RESULT_FIELDS (image link, source page, alt text, tag, status, timing);
+    image_records is None when the page failed. See fetch_and_parse_pages in fetch_common.py.
+    """
+    return fetch_and_parse_pages(urls, download_web_page, extract_image_records_from_html, (keyword,),
+                                 fetch_workers, parse_workers, controller)
+
+
 def save_all_results_to_file(filename, combined_links, script_name, url_count):
     """Saves the combined image links (deduplicated and sorted) to a text file."""
     try:
@@ -111,7 +204,25 @@ if __name__ == "__main__":
             pass
         exit()
 
+    while True:
+        output_format = input(f"Also stream every image link with the page it came from to a structured file? ({'/'.join(OUTPUT_FORMATS)}, leave blank to skip): ").strip().lower()
+        if not output_format or output_format in OUTPUT_FORMATS:
+            break
+        print(f"Invalid format. Please enter one of: {', '.join(OUTPUT_FORMATS)}.")
+
+    result_writer = None
+    if output_format:
+        default_filename = f"image_links_{keyword}_{datetime.datetime.now():%Y%m%d_%H%M%S}.{output_format}"
+        output_filename = input(f"Enter filename to stream to (blank for default '{default_filename}'): ").strip()
+        if not output_filename:
+            output_filename = default_filename
+        result_writer, writer_error = open_result_writer(output_filename, output_format)
+        if writer_error:
+            print(writer_error)
+            print("Continuing without structured output.")
+
     all_results = {}
+    urls_to_fetch = {}  # url to fetch -> url as written in the input file
 
     for url in urls:
         parsed = urlparse(url)
@@ -128,14 +239,42 @@ if __name__ == "__main__":
             all_results[url] = "Invalid URL format"
             continue
 
-        print(f"\nFetching image links from: {url_to_fetch}")
-        links, error = fetch_all_image_links(url_to_fetch, keyword)
-        if error:
-            print(error)
-            all_results[url] = error
-        else:
-            print(f"Found {len(links)} image links.")
-            all_results[url] = links
+        urls_to_fetch[url_to_fetch] = url
+
+    # look up every host up front so dead domains fail at once instead of per page
+    print(f"\nResolving the hosts of {len(urls_to_fetch)} URLs...")
+    failed_hosts = pre_resolve_hosts(urls_to_fetch)
+    for url_to_fetch in list(urls_to_fetch):
+        host = urlparse(url_to_fetch).hostname
+        if host in failed_hosts:
+            url = urls_to_fetch.pop(url_to_fetch)
+            print(f"\nFetching image links from: {url_to_fetch}")
+            print(failed_hosts[host])
+            all_results[url] = failed_hosts[host]
+
+    controller = AdaptiveController()
+    # the writer is closed even when the run stops early, so the file stays readable
+    try:
+        for url_to_fetch, image_records, error in fetch_image_links_from_many_pages(urls_to_fetch, keyword, controller=controller):
+            url = urls_to_fetch[url_to_fetch]
+            print(f"\nFetched image links from: {url_to_fetch}")
+            if error:
+                print(error)
+                all_results[url] = error
+            else:
+                print(f"Found {len(image_records)} image links.")
+                all_results[url] = [record['link'] for record in image_records]
+                if result_writer:
+                    result_writer.write(image_records)
+    finally:
+        if result_writer:
+            result_writer.close()
+            print(f"\nStreamed image links with their source pages to '{output_filename}'.")
+
+    if controller.finished:
+        print("\n--- Adaptive Fetch Settings ---")
+        for line in controller.summary():
+            print(line)
 
     # Combine and deduplicate
     combined_links = []
@@ -148,6 +287,27 @@ if __name__ == "__main__":
     if combined_links:
         for link in combined_links:
             print(link)
+
+        check_choice = input("\nCheck which of these image links are alive? (yes/no) [no]: ").strip().lower()
+        if check_choice in ('yes', 'y'):
+            print(f"Checking {len(combined_links)} links ({LINK_CHECK_WORKERS} at a time, {LINK_CHECK_PER_HOST} per host)...")
+            check_results = check_links(combined_links)
+            dead_links = [result for result in check_results.values() if not result['alive']]
+            print(f"\n--- Link Check: {len(check_results) - len(dead_links)} alive, {len(dead_links)} dead ---")
+            for result in dead_links:
+                print(f"- {result['link']} ({result['status'] or result['error']})")
+
+            check_save_choice = input("\nDo you want to save the link check results to a CSV file? (yes/no): ").lower().strip()
+            if check_save_choice in ['yes', 'y']:
+                default_filename = f"image_link_check_{keyword}_{datetime.datetime.now():%Y%m%d_%H%M%S}.csv"
+                output_filename = input(f"Enter filename to save as (blank for default '{default_filename}'): ").strip()
+                if not output_filename:
+                    output_filename = default_filename
+                success, save_error = save_link_check_results_to_file(output_filename, check_results)
+                if success:
+                    print("Link check results saved successfully.")
+                else:
+                    print(save_error)
     else:
         print("(No matching image links found across all pages)")
 
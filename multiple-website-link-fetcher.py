@@ -1,76 +1,443 @@
 import requests
 import os
+import re
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import datetime
-import msvcrt
+import json
 import time
+import zlib
+import xml.etree.ElementTree as ET
+from urllib.robotparser import RobotFileParser
+import socket
+import threading
+import tempfile
+import sqlite3
+import subprocess
+import sys
+import argparse
+from fetch_common import (
+    REQUEST_TIMEOUT, ACCEPT_ENCODING, MAX_BODY_BYTES, BODY_CHUNK_SIZE, HTML_CONTENT_TYPES,
+    FETCH_WORKERS, PARSE_WORKERS, OUTPUT_FORMATS, LINK_CHECK_WORKERS, LINK_CHECK_PER_HOST,
+    AdaptiveController, start_parse_pool, fetch_and_parse_pages, pre_resolve_hosts, connection_failure_kind,
+    link_matches_pattern, check_links, save_link_check_results_to_file, open_result_writer,
+)
+
+try:
+    import msvcrt  # windows only, used for "press any key"; workers can run on other systems
+except ImportError:
+    msvcrt = None
+
+try:
+    import redis  # optional (pip install redis), only needed for a work queue shared between hosts
+except ImportError:
+    redis = None
 
-REQUEST_TIMEOUT = 20
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 # note: use a working user agent when this one doesn't work
+RESPECT_ROBOTS_TXT = True  # skip pages that a site's robots.txt disallows
+ROBOTS_RETRY_SECONDS = 120  # an unreachable robots.txt disallows the site for this long, then it's fetched again
+SITEMAP_CHUNK_SIZE = 64 * 1024  # sitemaps are parsed as they stream in, this many bytes at a time
+MAX_SITEMAP_DEPTH = 3  # sitemap index files nested deeper than this are not followed
+# kinds of resources the single-pass extractor can collect
+RESOURCE_KINDS = ('anchor', 'image', 'stylesheet', 'script', 'media', 'link', 'css')
+META_IMAGE_PROPERTIES = ('og:image', 'og:image:url', 'og:image:secure_url', 'twitter:image', 'twitter:image:src')
+CSS_URL_PATTERN = re.compile(r'url\(\s*([\'"]?)(.*?)\1\s*\)', re.IGNORECASE)  # url(...) in inline CSS
+QUEUE_BATCH_SIZE = 100  # URLs a distributed worker leases at a time
+QUEUE_LEASE_SECONDS = 600  # a batch goes back to the queue if its worker stops renewing its lease
+QUEUE_LEASE_RENEW_SECONDS = QUEUE_LEASE_SECONDS / 3  # workers extend their lease this often while fetching
+QUEUE_POLL_SECONDS = 5
 
-def fetch_links_in_web_page(url, text_pattern_to_search):
+robots_rules_cache = {}  # "scheme://host" -> (RobotFileParser, expires_at, reason it could not be fetched or None)
+robots_host_locks = {}  # "scheme://host" -> Lock, so each robots.txt is downloaded once
+robots_lock = threading.Lock()
+
+def get_robots_lock(site_root):
+    with robots_lock:
+        if site_root not in robots_host_locks:
+            robots_host_locks[site_root] = threading.Lock()
+        return robots_host_locks[site_root]
+
+
+def get_robots_rules(url, timeout=REQUEST_TIMEOUT):
     """
-    Fetch links from a single page, resolving relative links to absolute using response.url
-    (so redirects are handled). Returns (links_list, error_message).
+    Return (rules, failure) for the host of `url`, where rules is its robots.txt. robots.txt
+    is downloaded once per host and cached for the rest of the run; concurrent first fetches
+    of a host wait for that one download. A missing robots.txt (4xx) allows everything,
+    401/403 disallows everything, and following RFC 9309 an unreachable one (timeout,
+    connection error, 429 or 5xx) disallows everything too, but only for ROBOTS_RETRY_SECONDS.
+
+    failure is None when the rules are usable. While robots.txt is unreachable it is
+    (failure, status, reason): the caller whose download failed gets the real failure kind
+    (timeout, dns, refused, connection, http or other, as in download_web_page) and the
+    others get 'skipped'.
     """
-    links = set()
-    error_message = None
-    print(f"  Fetching: {url}")
+    parsed = urlparse(url)
+    site_root = f"{parsed.scheme}://{parsed.netloc}"
+    cached = robots_rules_cache.get(site_root)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0], ('skipped', None, cached[2]) if cached[2] else None
+
+    with get_robots_lock(site_root):
+        cached = robots_rules_cache.get(site_root)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0], ('skipped', None, cached[2]) if cached[2] else None
+
+        rules = RobotFileParser(site_root + '/robots.txt')
+        failure = None
+        try:
+            headers = {'User-Agent': USER_AGENT}
+            response = requests.get(site_root + '/robots.txt', headers=headers, timeout=timeout)
+            if response.status_code == 429 or response.status_code >= 500:
+                failure = ('http', response.status_code, f"HTTP Error {response.status_code}")
+            elif response.status_code in (401, 403):
+                rules.disallow_all = True
+            elif response.status_code >= 400:
+                rules.allow_all = True
+            else:
+                rules.parse(response.text.splitlines())
+        except requests.exceptions.Timeout:
+            failure = ('timeout', None, f"timed out after {timeout} seconds")
+        except requests.exceptions.ConnectionError as e:
+            failure = (connection_failure_kind(e), None, "could not connect")
+        except requests.exceptions.RequestException as e:
+            failure = ('other', None, str(e))
+
+        if failure:
+            rules.disallow_all = True
+            robots_rules_cache[site_root] = (rules, time.monotonic() + ROBOTS_RETRY_SECONDS, failure[2])
+        else:
+            robots_rules_cache[site_root] = (rules, float('inf'), None)
+        return rules, failure
+
+
+def is_allowed_by_robots(url, timeout=REQUEST_TIMEOUT):
+    if not RESPECT_ROBOTS_TXT:
+        return True
+    rules, _ = get_robots_rules(url, timeout)
+    return rules.can_fetch(USER_AGENT, url)
+
+
+def iter_sitemap_urls(sitemap_url, errors, visited=None, depth=0):
+    """
+    Stream the page URLs listed in a sitemap, following sitemap index files and
+    decompressing gzipped sitemaps on the fly. The XML is fed to an incremental parser and every
+    finished <url>/<sitemap> entry is discarded, so memory stays flat however large the
+    sitemap is. Only URLs allowed by robots.txt are yielded. Problems are appended to
+    `errors` instead of stopping the discovery.
+
+    `visited` holds the sitemap URLs already read, so an index that lists itself (or a loop
+    of indexes) is read once, and indexes nested deeper than MAX_SITEMAP_DEPTH are skipped.
+    """
+    if visited is None:
+        visited = set()
+    if sitemap_url in visited:
+        return
+    visited.add(sitemap_url)
+
+    child_sitemaps = []
     try:
-        headers = {'User-Agent': USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-        response.raise_for_status()
+        headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING}
+        with requests.get(sitemap_url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            parser = ET.XMLPullParser(events=('start', 'end'))
+            decompressor = None
+            root = None
+            is_index = False
+            # iter_content already undoes Content-Encoding; .xml.gz files are gunzipped here
+            for chunk in response.iter_content(chunk_size=SITEMAP_CHUNK_SIZE):
+                if root is None and decompressor is None and chunk[:2] == b'\x1f\x8b':
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-        base_url = response.url  # use final URL after redirects as base
+                for event, elem in parser.read_events():
+                    tag = elem.tag.rsplit('}', 1)[-1]  # drop the sitemap namespace
+                    if root is None:
+                        root = elem
+                        is_index = tag == 'sitemapindex'
+                        continue
+                    if event != 'end':
+                        continue
 
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href'].strip()
+                    if tag == 'loc' and elem.text:
+                        loc = elem.text.strip()
+                        if is_index:
+                            # a sitemap index holds at most 50,000 entries, so these are cheap to keep
+                            child_sitemaps.append(loc)
+                        elif is_allowed_by_robots(loc):
+                            yield loc
+                    elif tag in ('url', 'sitemap'):
+                        root.clear()
+            parser.close()
 
-            # Skip anchors, javascript:, mailto:, tel:, and data URIs
-            if not href or href.startswith('#') or href.lower().startswith(('javascript:', 'mailto:', 'tel:', 'data:')):
-                continue
+    except requests.exceptions.RequestException as e:
+        errors.append(f"{sitemap_url}: Error fetching sitemap: {e}")
+    except (ET.ParseError, zlib.error) as e:
+        errors.append(f"{sitemap_url}: Error reading sitemap: {e}")
 
-            absolute_link = urljoin(base_url, href)
-            parsed = urlparse(absolute_link)
+    if child_sitemaps and depth >= MAX_SITEMAP_DEPTH:
+        errors.append(f"{sitemap_url}: Skipped {len(child_sitemaps)} sitemaps nested more than {MAX_SITEMAP_DEPTH} levels deep")
+        return
+    for child_sitemap_url in child_sitemaps:
+        yield from iter_sitemap_urls(child_sitemap_url, errors, visited, depth + 1)
 
-            # Ensure we only keep http(s) links
-            if parsed.scheme not in ('http', 'https'):
-                continue
 
-            normalized = parsed.geturl()
+def read_ahead(items):
+    """
+    Consume the strings of `items` on a background thread as fast as they come, spooling
+    them to a temporary file, and yield them from there at the caller's pace. Sitemaps are
+    read through this, so a caller that only takes a URL whenever a fetch slot frees up
+    never leaves the sitemap download idle long enough for the server to drop it, and memory
+    stays flat however far the reader gets ahead.
+    """
+    spool = tempfile.TemporaryFile()
+    condition = threading.Condition()
+    state = {'written': 0, 'finished': False, 'stopped': False}
+
+    def reader():
+        try:
+            for item in items:
+                with condition:
+                    if state['stopped']:
+                        return
+                    spool.seek(0, os.SEEK_END)
+                    spool.write(item.encode('utf-8') + b'\n')
+                    state['written'] += 1
+                    condition.notify()
+        finally:
+            with condition:
+                state['finished'] = True
+                condition.notify()
 
-            # case-insensitive substring match (if provided)
-            if text_pattern_to_search:
-                if text_pattern_to_search.lower() not in normalized.lower():
-                    continue
+    threading.Thread(target=reader, daemon=True).start()
+    read_count = 0
+    position = 0
+    try:
+        while True:
+            with condition:
+                while read_count == state['written'] and not state['finished']:
+                    condition.wait()
+                if read_count == state['written']:
+                    break
+                spool.seek(position)
+                line = spool.readline()
+                position = spool.tell()
+            read_count += 1
+            yield line[:-1].decode('utf-8')
+    finally:
+        with condition:
+            state['stopped'] = True
+            spool.close()
 
-            links.add(normalized)
 
-        links_list = sorted(links)
-        print(f"  Found {len(links_list)} matching links on this page.")
-        return links_list, None
+def discover_urls_from_sitemaps(site_url, errors):
+    """
+    Yield the robots.txt-allowed page URLs of a site from the Sitemap: lines in its robots.txt,
+    falling back to /sitemap.xml when robots.txt lists none. The sitemaps are read ahead on
+    a background thread (see read_ahead), independent of how fast the URLs are used.
+    """
+    parsed = urlparse(site_url)
+    rules, _ = get_robots_rules(site_url)
+    sitemap_urls = rules.site_maps()
+    if not sitemap_urls:
+        sitemap_urls = [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+
+    def all_sitemap_urls():
+        visited = set()
+        for sitemap_url in sitemap_urls:
+            yield from iter_sitemap_urls(sitemap_url, errors, visited)
+
+    yield from read_ahead(all_sitemap_urls())
+
+
+def download_web_page(url, timeout=REQUEST_TIMEOUT):
+    """
+    Download a single page. Returns (page, error_message) where page is a dict with the raw
+    'content', the 'base_url' (final URL after redirects, used to resolve relative links),
+    the HTTP 'status', when it was fetched ('fetched_at') and how long it took ('fetch_seconds',
+    not counting the robots.txt check). robots.txt is fetched with the same timeout as the page,
+    and when it can't be fetched the page isn't either: its failure is returned as the page's,
+    so the AdaptiveController learns from it.
+    When the download fails, page only holds 'failure' (timeout, dns, refused, connection, http,
+    skipped or other), 'status' and 'fetch_seconds', which is what the AdaptiveController learns from.
+    """
+    started = time.monotonic()
+
+    def failed(failure, status=None):
+        return {'failure': failure, 'status': status, 'fetch_seconds': round(time.monotonic() - started, 3)}
+
+    try:
+        if RESPECT_ROBOTS_TXT:
+            rules, robots_failure = get_robots_rules(url, timeout)
+            if robots_failure:
+                failure, status, reason = robots_failure
+                return failed(failure, status), f"Skipped: {url}, the site's robots.txt could not be fetched ({reason})"
+            if not rules.can_fetch(USER_AGENT, url):
+                return failed('skipped'), f"Skipped: {url} is disallowed by the site's robots.txt"
+        # time the page itself, the first page of a host shouldn't also carry its robots.txt download
+        started = time.monotonic()
+        fetched_at = datetime.datetime.now().isoformat(timespec='seconds')
+
+        headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING}
+        with requests.get(url, headers=headers, timeout=timeout, allow_redirects=True, stream=True) as response:
+            response.raise_for_status()
+
+            # decide from the headers alone, before any of the body is downloaded
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and content_type.split(';')[0].strip().lower() not in HTML_CONTENT_TYPES:
+                return failed('skipped', response.status_code), f"Skipped: {url} is not an HTML page (Content-Type: {content_type})"
+            content_length = response.headers.get('Content-Length', '')
+            if content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+                return failed('skipped', response.status_code), f"Skipped: {url} is larger than {MAX_BODY_BYTES} bytes ({content_length} bytes)"
+
+            # iter_content decompresses as it reads, so the size limit applies to the decoded page
+            chunks = []
+            body_size = 0
+            for chunk in response.iter_content(chunk_size=BODY_CHUNK_SIZE):
+                body_size += len(chunk)
+                if body_size > MAX_BODY_BYTES:
+                    return failed('skipped', response.status_code), f"Skipped: {url} is larger than {MAX_BODY_BYTES} bytes"
+                chunks.append(chunk)
+
+            page = {
+                'content': b''.join(chunks),
+                'base_url': response.url,
+                'status': response.status_code,
+                'fetched_at': fetched_at,
+                'fetch_seconds': round(time.monotonic() - started, 3),
+            }
+            return page, None
 
     except requests.exceptions.Timeout:
-        error_message = f"Error: The request to {url} timed out after {REQUEST_TIMEOUT} seconds."
-        return [], error_message
+        error_message = f"Error: The request to {url} timed out after {timeout} seconds."
+        return failed('timeout'), error_message
     except requests.exceptions.HTTPError as e:
         status = e.response.status_code if e.response is not None else "N/A"
         error_message = f"Error: HTTP Error {status} for URL {url}"
-        return [], error_message
-    except requests.exceptions.ConnectionError:
+        return failed('http', e.response.status_code if e.response is not None else None), error_message
+    except requests.exceptions.ConnectionError as e:
         error_message = f"Error: Could not connect to {url}. Check network or URL validity."
-        return [], error_message
+        return failed(connection_failure_kind(e)), error_message
     except requests.exceptions.RequestException as e:
         error_message = f"Error fetching URL {url}: {e}"
+        return failed('other'), error_message
+    except Exception as e:
+        error_message = f"An unexpected error occurred while processing {url}: {e}"
+        return failed('other'), error_message
+
+
+def extract_resource_records_from_html(content, base_url, text_pattern_to_search, kinds=RESOURCE_KINDS):
+    """
+    Parse raw page content and collect every resource URL of the requested kinds in a single
+    walk over the document: anchors, images (img src/srcset, <source srcset>, video posters,
+    og:image/twitter:image meta), stylesheets and other <link> hrefs, <script src>,
+    video/audio/source/track media, and url() references in inline CSS.
+
+    Returns one record per kind of each absolute http(s) URL containing text_pattern_to_search,
+    sorted by link and kind: {'link', 'text', 'tag', 'kind'}, where text is the anchor/alt text
+    (or the rel of a <link>) of the first tag that referenced it as that kind. A URL used as
+    more than one kind (say preloaded and shown in an <img>) gets a record for each.
+
+    This runs inside the parser processes, so it has to stay a plain top-level function that
+    only takes picklable arguments.
+    """
+    records = {}
+
+    def add(raw_url, kind, tag_name, text=''):
+        if kind not in kinds:
+            return
+        raw_url = raw_url.strip()
+        # Skip anchors, javascript:, mailto:, tel:, and data URIs
+        if not raw_url or raw_url.startswith('#') or raw_url.lower().startswith(('javascript:', 'mailto:', 'tel:', 'data:')):
+            return
+
+        parsed = urlparse(urljoin(base_url, raw_url))
+        # Ensure we only keep http(s) links
+        if parsed.scheme not in ('http', 'https'):
+            return
+
+        normalized = parsed.geturl()
+        if (normalized, kind) not in records and link_matches_pattern(normalized, text_pattern_to_search):
+            records[(normalized, kind)] = {'link': normalized, 'text': text, 'tag': tag_name, 'kind': kind}
+
+    soup = BeautifulSoup(content, 'html.parser')
+
+    for tag in soup.find_all(True):
+        name = tag.name
+
+        if name == 'a' and tag.get('href'):
+            add(tag['href'], 'anchor', name, tag.get_text(' ', strip=True))
+        elif name == 'link' and tag.get('href'):
+            rel = [value.lower() for value in tag.get('rel', [])]
+            add(tag['href'], 'stylesheet' if 'stylesheet' in rel else 'link', name, ' '.join(rel))
+        elif name == 'script' and tag.get('src'):
+            add(tag['src'], 'script', name)
+        elif name == 'img' and tag.get('src'):
+            add(tag['src'], 'image', name, tag.get('alt', '').strip())
+        elif name in ('video', 'audio', 'source', 'track') and tag.get('src'):
+            # <source> inside <picture> is an image, inside <video>/<audio> it's media
+            in_picture = name == 'source' and tag.parent is not None and tag.parent.name == 'picture'
+            add(tag['src'], 'image' if in_picture else 'media', name)
+        elif name == 'meta' and tag.get('content'):
+            meta_name = (tag.get('property') or tag.get('name') or '').lower()
+            if meta_name in META_IMAGE_PROPERTIES:
+                add(tag['content'], 'image', name, meta_name)
+        elif name == 'style' and tag.string:
+            for match in CSS_URL_PATTERN.finditer(tag.string):
+                add(match.group(2), 'css', name)
+
+        if name == 'video' and tag.get('poster'):
+            add(tag['poster'], 'image', name)
+        if tag.get('srcset'):
+            # srcset can contain multiple candidates separated by commas
+            for candidate in tag['srcset'].split(','):
+                if candidate.strip():
+                    add(candidate.strip().split(' ')[0], 'image', name, tag.get('alt', '').strip())
+        if tag.get('style'):
+            for match in CSS_URL_PATTERN.finditer(tag['style']):
+                add(match.group(2), 'css', name)
+
+    return [records[key] for key in sorted(records)]
+
+
+def extract_links_from_html(content, base_url, text_pattern_to_search):
+    """Parse raw page content and return a sorted list of absolute http(s) <a> links containing text_pattern_to_search."""
+    return [record['link'] for record in extract_resource_records_from_html(content, base_url, text_pattern_to_search, kinds=('anchor',))]
+
+
+def fetch_links_in_web_page(url, text_pattern_to_search):
+    """
+    Fetch links from a single page, resolving relative links to absolute using response.url
+    (so redirects are handled). Returns (links_list, error_message).
+    """
+    print(f"  Fetching: {url}")
+    page, error_message = download_web_page(url)
+    if error_message:
         return [], error_message
+
+    try:
+        links_list = extract_links_from_html(page['content'], page['base_url'], text_pattern_to_search)
+        print(f"  Found {len(links_list)} matching links on this page.")
+        return links_list, None
     except Exception as e:
         error_message = f"An unexpected error occurred while processing {url}: {e}"
         return [], error_message
 
 
+def fetch_links_from_many_pages(urls, text_pattern_to_search, kinds=('anchor',), fetch_workers=FETCH_WORKERS, parse_workers=PARSE_WORKERS, controller=None, parse_pool=None):
+    """
+    Fetch many pages at once and yield (url, link_records, error_message) as each one finishes.
+    Each link record is a dict with the RESULT_FIELDS: the link, the page it was found on,
+    its anchor text, tag and resource kind, and the HTTP status and timing of that page.
+    `kinds` picks which RESOURCE_KINDS are collected; they all come from one parse per page.
+    Downloads, parsing and the adaptive tuning are done by fetch_and_parse_pages (fetch_common.py).
+    """
+    for url, link_records, error_message in fetch_and_parse_pages(
+            urls, download_web_page, extract_resource_records_from_html, (text_pattern_to_search, kinds),
+            fetch_workers, parse_workers, controller, parse_pool):
+        yield url, link_records or [], error_message
+
+
 def save_links_to_file(filename, links, script_name, input_file_path, text_pattern):
     """Saves the collected links to a text file."""
     try:
@@ -94,6 +461,372 @@ def save_links_to_file(filename, links, script_name, input_file_path, text_patte
         return False, error_message
 
 
+class SqliteWorkQueue:
+    """
+    Work queue kept in a SQLite file: URL batches with leases, plus the merged, deduplicated
+    results. Good for several worker processes on one machine (and as a local stand-in for
+    testing); use RedisWorkQueue to spread workers over several hosts.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS job (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS batches (
+                id INTEGER PRIMARY KEY, urls TEXT, state TEXT DEFAULT 'pending',
+                worker TEXT, lease_expires REAL, attempts INTEGER DEFAULT 0);
+            CREATE TABLE IF NOT EXISTS results (link TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS errors (message TEXT);
+        ''')
+
+    def has_job(self):
+        return self.connection.execute('SELECT COUNT(*) FROM job').fetchone()[0] > 0
+
+    def reset(self):
+        """Drop the job, its batches, results and errors."""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            for table in ('job', 'batches', 'results', 'errors'):
+                self.connection.execute(f'DELETE FROM {table}')
+            self.connection.execute('COMMIT')
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def set_job(self, text_pattern, kinds):
+        self.connection.executemany('INSERT OR REPLACE INTO job VALUES (?, ?)',
+                                    [('text_pattern', text_pattern), ('kinds', ','.join(kinds))])
+
+    def get_job(self):
+        job = dict(self.connection.execute('SELECT key, value FROM job'))
+        return job.get('text_pattern', ''), tuple(job.get('kinds', 'anchor').split(','))
+
+    def add_batches(self, urls, batch_size):
+        batches = [(json.dumps(urls[i:i + batch_size]),) for i in range(0, len(urls), batch_size)]
+        self.connection.executemany('INSERT INTO batches (urls) VALUES (?)', batches)
+
+    def lease_batch(self, worker_id, lease_seconds):
+        """Hand out the next pending (or expired) batch. Returns (batch_id, urls) or None."""
+        now = time.time()
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.connection.execute(
+                "SELECT id, urls FROM batches WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE batches SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker_id, now + lease_seconds, row[0]))
+            self.connection.execute('COMMIT')
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def renew_lease(self, batch_id, worker_id, lease_seconds):
+        """Extend a lease this worker still holds. Returns False when the batch was handed to someone else."""
+        cursor = self.connection.execute(
+            "UPDATE batches SET lease_expires = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+            (time.time() + lease_seconds, batch_id, worker_id))
+        return cursor.rowcount > 0
+
+    def complete_batch(self, batch_id, worker_id, links, errors):
+        """
+        Store a batch's links and errors and mark it done, but only while this worker still
+        holds its lease. Returns False (and stores nothing) when the batch went to someone else.
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = self.connection.execute(
+                "UPDATE batches SET state = 'done' WHERE id = ? AND worker = ? AND state = 'leased'",
+                (batch_id, worker_id))
+            if cursor.rowcount > 0:
+                self.connection.executemany('INSERT OR IGNORE INTO results VALUES (?)', [(link,) for link in links])
+                self.connection.executemany('INSERT INTO errors VALUES (?)', [(error,) for error in errors])
+            self.connection.execute('COMMIT')
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        return cursor.rowcount > 0
+
+    def progress(self):
+        """Returns (done, leased, pending) batch counts."""
+        counts = dict(self.connection.execute('SELECT state, COUNT(*) FROM batches GROUP BY state'))
+        return counts.get('done', 0), counts.get('leased', 0), counts.get('pending', 0)
+
+    def results(self):
+        return [row[0] for row in self.connection.execute('SELECT link FROM results ORDER BY link')]
+
+    def errors(self):
+        return [row[0] for row in self.connection.execute('SELECT message FROM errors')]
+
+
+class RedisWorkQueue:
+    """
+    The same work queue on a Redis-protocol server (Redis, Valkey, KeyDB...), so workers on
+    several hosts can share it. Needs the redis package. Leasing runs as a Lua script so a
+    batch can't be handed to two workers or dropped between the pop and the lease; the lease
+    owner is kept in the leases:owner hash, and renewing or completing a batch are Lua scripts
+    too, so they only act for the worker that still holds the lease.
+    """
+
+    LEASE_SCRIPT = '''
+        local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+        for _, batch_id in ipairs(expired) do
+            redis.call('ZREM', KEYS[2], batch_id)
+            redis.call('HDEL', KEYS[3], batch_id)
+            redis.call('RPUSH', KEYS[1], batch_id)
+        end
+        local batch_id = redis.call('LPOP', KEYS[1])
+        if batch_id then
+            redis.call('ZADD', KEYS[2], ARGV[2], batch_id)
+            redis.call('HSET', KEYS[3], batch_id, ARGV[3])
+        end
+        return batch_id
+    '''
+
+    RENEW_SCRIPT = '''
+        if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+            return 0
+        end
+        redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+        return 1
+    '''
+
+    COMPLETE_SCRIPT = '''
+        if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+            return 0
+        end
+        for _, link in ipairs(cjson.decode(ARGV[3])) do
+            redis.call('SADD', KEYS[4], link)
+        end
+        for _, message in ipairs(cjson.decode(ARGV[4])) do
+            redis.call('RPUSH', KEYS[5], message)
+        end
+        redis.call('ZREM', KEYS[1], ARGV[1])
+        redis.call('HDEL', KEYS[2], ARGV[1])
+        redis.call('SADD', KEYS[3], ARGV[1])
+        return 1
+    '''
+
+    def __init__(self, url, prefix='link-fetcher'):
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.lease_script = self.redis.register_script(self.LEASE_SCRIPT)
+        self.renew_script = self.redis.register_script(self.RENEW_SCRIPT)
+        self.complete_script = self.redis.register_script(self.COMPLETE_SCRIPT)
+
+    def key(self, name):
+        return f"{self.prefix}:{name}"
+
+    def has_job(self):
+        return self.redis.exists(self.key('job')) > 0
+
+    def reset(self):
+        """Drop the job, its batches, results and errors."""
+        keys = [self.key(name) for name in ('job', 'batch_count', 'pending', 'leases', 'leases:owner', 'done', 'results', 'errors')]
+        keys.extend(self.redis.scan_iter(match=self.key('batch:*')))
+        self.redis.delete(*keys)
+
+    def set_job(self, text_pattern, kinds):
+        self.redis.hset(self.key('job'), mapping={'text_pattern': text_pattern, 'kinds': ','.join(kinds)})
+
+    def get_job(self):
+        job = self.redis.hgetall(self.key('job'))
+        return job.get('text_pattern', ''), tuple(job.get('kinds', 'anchor').split(','))
+
+    def add_batches(self, urls, batch_size):
+        pipeline = self.redis.pipeline()
+        first_id = int(self.redis.get(self.key('batch_count')) or 0)
+        for batch_id, i in enumerate(range(0, len(urls), batch_size), start=first_id):
+            pipeline.set(self.key(f"batch:{batch_id}"), json.dumps(urls[i:i + batch_size]))
+            pipeline.rpush(self.key('pending'), batch_id)
+            pipeline.incr(self.key('batch_count'))
+        pipeline.execute()
+
+    def lease_batch(self, worker_id, lease_seconds):
+        now = time.time()
+        batch_id = self.lease_script(keys=[self.key('pending'), self.key('leases'), self.key('leases:owner')],
+                                     args=[now, now + lease_seconds, worker_id])
+        if batch_id is None:
+            return None
+        return int(batch_id), json.loads(self.redis.get(self.key(f"batch:{batch_id}")))
+
+    def renew_lease(self, batch_id, worker_id, lease_seconds):
+        """Extend a lease this worker still holds. Returns False when the batch was handed to someone else."""
+        return self.renew_script(keys=[self.key('leases'), self.key('leases:owner')],
+                                 args=[batch_id, worker_id, time.time() + lease_seconds]) == 1
+
+    def complete_batch(self, batch_id, worker_id, links, errors):
+        """Same as SqliteWorkQueue.complete_batch: nothing is stored unless this worker holds the lease."""
+        keys = [self.key(name) for name in ('leases', 'leases:owner', 'done', 'results', 'errors')]
+        return self.complete_script(keys=keys, args=[batch_id, worker_id, json.dumps(links), json.dumps(errors)]) == 1
+
+    def progress(self):
+        done = self.redis.scard(self.key('done'))
+        leased = self.redis.zcard(self.key('leases'))
+        pending = self.redis.llen(self.key('pending'))
+        return done, leased, pending
+
+    def results(self):
+        return sorted(self.redis.smembers(self.key('results')))
+
+    def errors(self):
+        return self.redis.lrange(self.key('errors'), 0, -1)
+
+
+def open_work_queue(location):
+    """redis://host:port/db opens a RedisWorkQueue, anything else is a SQLite file path."""
+    if location.startswith(('redis://', 'rediss://')):
+        if redis is None:
+            raise RuntimeError("a Redis work queue needs the redis package (pip install redis)")
+        return RedisWorkQueue(location)
+    return SqliteWorkQueue(location)
+
+
+def run_worker(queue_location, worker_id=None, parse_workers=PARSE_WORKERS):
+    """
+    Lease URL batches from the work queue and fetch them with fetch_links_from_many_pages
+    until every batch is done. The lease is renewed every QUEUE_LEASE_RENEW_SECONDS while
+    the batch is being fetched; a worker that dies keeps its lease only until it expires,
+    then the batch goes back to the other workers. One parser pool serves every batch.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    work_queue = open_work_queue(queue_location)
+    text_pattern, kinds = work_queue.get_job()
+    print(f"[{worker_id}] started, searching for '{text_pattern}' ({', '.join(kinds)})")
+    controller = AdaptiveController()
+
+    with start_parse_pool(parse_workers) as parse_pool:
+        while True:
+            leased = work_queue.lease_batch(worker_id, QUEUE_LEASE_SECONDS)
+            if leased is None:
+                done, leased_count, pending = work_queue.progress()
+                if leased_count == 0 and pending == 0:
+                    break
+                # other workers still hold leases; wait in case one of them dies and its batch expires
+                time.sleep(QUEUE_POLL_SECONDS)
+                continue
+
+            batch_id, urls = leased
+            links = set()
+            errors = []
+            lease_renewed_at = time.monotonic()
+            lost_lease = False
+            for url, link_records, error in fetch_links_from_many_pages(urls, text_pattern, kinds, parse_workers=parse_workers,
+                                                                        controller=controller, parse_pool=parse_pool):
+                if error:
+                    errors.append(f"{url}: {error}")
+                links.update(record['link'] for record in link_records)
+                if time.monotonic() - lease_renewed_at >= QUEUE_LEASE_RENEW_SECONDS:
+                    if not work_queue.renew_lease(batch_id, worker_id, QUEUE_LEASE_SECONDS):
+                        lost_lease = True
+                        break
+                    lease_renewed_at = time.monotonic()
+
+            if lost_lease or not work_queue.complete_batch(batch_id, worker_id, sorted(links), errors):
+                # the lease ran out before it could be renewed and the batch belongs to another worker now
+                print(f"[{worker_id}] batch {batch_id}: lease lost, leaving the batch to the worker that holds it")
+                continue
+            print(f"[{worker_id}] batch {batch_id}: {len(urls)} pages, {len(links)} links, {len(errors)} errors, "
+                  f"{controller.concurrency} concurrent downloads")
+
+    print(f"[{worker_id}] no batches left, exiting")
+
+
+def run_coordinator(queue_location, url_file_path, text_pattern, kinds, batch_size, local_workers, output_filename, reset=False):
+    """
+    Load the URL list into the work queue, optionally start local worker processes, report
+    progress until every batch is done and save the merged, deduplicated links. A queue that
+    already holds a job is refused, so an old run's results can't leak into this one, unless
+    `reset` is set, which clears it first.
+    """
+    script_name = os.path.basename(__file__)
+    urls = []
+    with open(url_file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            url = line.strip()
+            if url and not url.startswith('#'):
+                url = add_scheme_if_missing(url)
+                if is_valid_url(url):
+                    urls.append(url)
+
+    work_queue = open_work_queue(queue_location)
+    if work_queue.has_job():
+        if not reset:
+            print(f"Error: '{queue_location}' already holds a job. Use a new queue, or --reset to clear it.")
+            return 1
+        work_queue.reset()
+        print(f"Cleared the previous job from '{queue_location}'.")
+    work_queue.set_job(text_pattern, kinds)
+    work_queue.add_batches(urls, batch_size)
+    print(f"Queued {len(urls)} URLs in batches of {batch_size} at '{queue_location}'.")
+
+    # local workers share this machine's cores instead of each starting PARSE_WORKERS parsers
+    parse_workers = max(1, PARSE_WORKERS // max(1, local_workers))
+    workers = [subprocess.Popen([sys.executable, os.path.abspath(__file__), 'work', queue_location,
+                                 '--parse-workers', str(parse_workers)])
+               for _ in range(local_workers)]
+    if workers:
+        print(f"Started {len(workers)} local worker processes.")
+    else:
+        print(f"Start workers with: python {script_name} work {queue_location}")
+
+    while True:
+        done, leased, pending = work_queue.progress()
+        print(f"  batches done: {done}, in progress: {leased}, waiting: {pending}")
+        if leased == 0 and pending == 0:
+            break
+        time.sleep(QUEUE_POLL_SECONDS)
+
+    for worker in workers:
+        worker.wait()
+
+    links = work_queue.results()
+    errors = work_queue.errors()
+    print(f"\n{script_name} has fetched a total of {len(links)} unique links containing '{text_pattern}' ({len(errors)} errors).")
+    success, save_error = save_links_to_file(output_filename, links, script_name, url_file_path, text_pattern)
+    print(f"Links saved to '{output_filename}'." if success else save_error)
+    return 0 if success else 1
+
+
+def run_distributed_command(argv):
+    """Command line entry point for the coordinator/worker mode, see --help."""
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(__file__),
+        description="Fetch a very large URL list with several workers sharing a work queue. "
+                    "Run without arguments for the interactive mode.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    coordinate = commands.add_parser('coordinate', help="queue a URL list, wait for the workers and save the merged links")
+    coordinate.add_argument('queue', help="SQLite file path, or redis://host:port/db to share the queue between hosts")
+    coordinate.add_argument('url_file', help="text file with one web page URL per line")
+    coordinate.add_argument('--pattern', default='', help="only keep links containing this text")
+    coordinate.add_argument('--kinds', default='anchor', help=f"comma separated kinds to collect ({', '.join(RESOURCE_KINDS)})")
+    coordinate.add_argument('--batch-size', type=int, default=QUEUE_BATCH_SIZE, help="URLs handed to a worker at a time")
+    coordinate.add_argument('--local-workers', type=int, default=0, help="worker processes to start on this machine")
+    coordinate.add_argument('--output', help="text file for the merged links")
+    coordinate.add_argument('--reset', action='store_true', help="clear a previous job left in the queue")
+
+    work = commands.add_parser('work', help="fetch batches from the queue until it is empty")
+    work.add_argument('queue', help="the same queue location the coordinator uses")
+    work.add_argument('--worker-id', help="name shown in logs (default: hostname-pid)")
+    work.add_argument('--parse-workers', type=int, default=PARSE_WORKERS, help=f"parser processes (default: {PARSE_WORKERS})")
+
+    args = parser.parse_args(argv)
+    if args.command == 'work':
+        run_worker(args.queue, args.worker_id, args.parse_workers)
+        return 0
+
+    kinds = tuple(kind.strip() for kind in args.kinds.split(',') if kind.strip())
+    unknown_kinds = [kind for kind in kinds if kind not in RESOURCE_KINDS]
+    if unknown_kinds:
+        parser.error(f"unknown kind(s): {', '.join(unknown_kinds)}")
+    output_filename = args.output or f"{os.path.splitext(os.path.basename(args.url_file))[0]}_links_{datetime.datetime.now():%Y%m%d_%H%M%S}.txt"
+    return run_coordinator(args.queue, args.url_file, args.pattern, kinds, args.batch_size, args.local_workers, output_filename, args.reset)
+
+
 def is_valid_url(url):
     try:
         result = urlparse(url)
@@ -117,6 +850,10 @@ def add_scheme_if_missing(url):
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # coordinator/worker mode for URL lists too big for one machine
+        sys.exit(run_distributed_command(sys.argv[1:]))
+
     script_name = os.path.basename(__file__)
     print(f"--- {script_name} ---\n\n")
     print("Fetches links containing specific text from multiple web pages listed in a file.")
@@ -132,6 +869,42 @@ if __name__ == "__main__":
     if not text_pattern:
         print("Warning: No text provided. The script will fetch ALL valid links.")
 
+    while True:
+        kinds_input = input(f"Which kinds of links to collect? ({', '.join(RESOURCE_KINDS)}, or all; comma separated, leave blank for anchor): ").strip().lower()
+        if kinds_input == 'all':
+            kinds = RESOURCE_KINDS
+        else:
+            kinds = tuple(kind.strip() for kind in kinds_input.split(',') if kind.strip()) or ('anchor',)
+        unknown_kinds = [kind for kind in kinds if kind not in RESOURCE_KINDS]
+        if not unknown_kinds:
+            break
+        print(f"Unknown kind(s): {', '.join(unknown_kinds)}. Please choose from: {', '.join(RESOURCE_KINDS)}.")
+
+    sitemap_choice = input("Discover pages from each site's robots.txt and sitemaps instead of using the URLs as pages? (yes/no) [no]: ").strip().lower()
+    use_sitemaps = sitemap_choice in ('yes', 'y')
+    fetch_discovered_pages = False
+    if use_sitemaps:
+        fetch_choice = input("Also fetch each discovered page and collect the links on it? (yes/no) [no]: ").strip().lower()
+        fetch_discovered_pages = fetch_choice in ('yes', 'y')
+
+    while True:
+        output_format = input(f"Also stream every link with the page it came from to a structured file? ({'/'.join(OUTPUT_FORMATS)}, leave blank to skip): ").strip().lower()
+        if not output_format or output_format in OUTPUT_FORMATS:
+            break
+        print(f"Invalid format. Please enter one of: {', '.join(OUTPUT_FORMATS)}.")
+
+    result_writer = None
+    if output_format:
+        input_filename_base = os.path.splitext(os.path.basename(url_file_path))[0]
+        default_filename = f"{input_filename_base}_links_{datetime.datetime.now():%Y%m%d_%H%M%S}.{output_format}"
+        output_filename = input(f"Enter filename to stream to (leave blank for default: '{default_filename}'): ").strip()
+        if not output_filename:
+            output_filename = default_filename
+        result_writer, writer_error = open_result_writer(output_filename, output_format)
+        if writer_error:
+            print(writer_error)
+            print("Continuing without structured output.")
+
     urls_to_process = []
     try:
         with open(url_file_path, 'r', encoding='utf-8') as f:
@@ -157,10 +930,8 @@ if __name__ == "__main__":
     skipped_count = 0
 
     print("\nProcessing URLs...")
-    total_urls = len(urls_to_process)
-    for i, url in enumerate(urls_to_process):
-        print(f"\n[{i+1}/{total_urls}] Processing: {url}")
-
+    urls_to_fetch = []
+    for url in urls_to_process:
         url_to_fetch = add_scheme_if_missing(url)
 
         if not is_valid_url(url_to_fetch):
@@ -170,17 +941,74 @@ if __name__ == "__main__":
             skipped_count += 1
             continue
 
-        found_links_for_url, error = fetch_links_in_web_page(url_to_fetch, text_pattern)
+        urls_to_fetch.append(url_to_fetch)
+
+    # look up every host up front so dead domains fail at once instead of per page
+    print(f"Resolving the hosts of {len(urls_to_fetch)} URLs...")
+    failed_hosts = pre_resolve_hosts(urls_to_fetch)
+    if failed_hosts:
+        resolvable_urls = []
+        for url_to_fetch in urls_to_fetch:
+            host = urlparse(url_to_fetch).hostname
+            if host in failed_hosts:
+                print(f"  Skipped: {failed_hosts[host]} ({url_to_fetch})")
+                errors_encountered.append(f"{url_to_fetch}: {failed_hosts[host]}")
+                skipped_count += 1
+            else:
+                resolvable_urls.append(url_to_fetch)
+        urls_to_fetch = resolvable_urls
+
+    total_urls = len(urls_to_fetch)
+    controller = AdaptiveController()
+    # the writer is closed even when the run stops early, so the file stays readable
+    try:
+        if use_sitemaps:
+            def discovered_page_urls(site_urls):
+                # sitemap entries matching the pattern are results on their own, no HTML fetch needed;
+                # every page is yielded though, the links on it may match even when its own URL doesn't
+                seen = set()
+                for site_url in site_urls:
+                    print(f"\nReading robots.txt and sitemaps of: {site_url}")
+                    for page_url in discover_urls_from_sitemaps(site_url, errors_encountered):
+                        if page_url in seen:
+                            continue
+                        seen.add(page_url)
+                        if link_matches_pattern(page_url, text_pattern):
+                            all_found_links.append(page_url)
+                            if result_writer:
+                                result_writer.write([{'link': page_url, 'source_url': site_url, 'tag': 'sitemap', 'kind': 'anchor'}])
+                        yield page_url
+
+            if fetch_discovered_pages:
+                # fed straight into the fetch queue while the sitemaps are still being read
+                urls_to_fetch = discovered_page_urls(urls_to_fetch)
+                total_urls = "?"
+            else:
+                for page_url in discovered_page_urls(urls_to_fetch):
+                    pass
+                print(f"Discovered {len(all_found_links)} matching pages from sitemaps.")
+                urls_to_fetch = []
+
+        if urls_to_fetch:
+            print(f"Fetching with {controller.concurrency} to {controller.max_concurrency} download threads and {PARSE_WORKERS} parser processes.")
+        for i, (url_to_fetch, link_records, error) in enumerate(fetch_links_from_many_pages(urls_to_fetch, text_pattern, kinds, controller=controller)):
+            print(f"\n[{i+1}/{total_urls}] Processed: {url_to_fetch}")
 
-        if error:
-            print(f"  {error}")
-            errors_encountered.append(f"{url_to_fetch}: {error}")
-        if found_links_for_url:
-            all_found_links.extend(found_links_for_url)
+            if error:
+                print(f"  {error}")
+                errors_encountered.append(f"{url_to_fetch}: {error}")
+            else:
+                print(f"  Found {len({record['link'] for record in link_records})} matching links on this page.")
+            if link_records:
+                all_found_links.extend(record['link'] for record in link_records)
+                if result_writer:
+                    result_writer.write(link_records)
 
-        processed_count += 1
-        # polite delay (optional)
-        # time.sleep(0.2)
+            processed_count += 1
+    finally:
+        if result_writer:
+            result_writer.close()
+            print(f"\nStreamed links with their source pages to '{output_filename}'.")
 
     print("\n--- Processing Complete ---")
 
@@ -188,7 +1016,11 @@ if __name__ == "__main__":
 
     print(f"\nProcessed {processed_count} URLs.")
     if skipped_count > 0:
-       print(f"Skipped {skipped_count} URLs due to invalid format.")
+       print(f"Skipped {skipped_count} URLs due to invalid format or unresolvable hosts.")
+    if controller.finished:
+        print("\n--- Adaptive Fetch Settings ---")
+        for line in controller.summary():
+            print(line)
     print(f"\n{script_name} has fetched a total of {len(unique_found_links)} unique links containing '{text_pattern}'.")
 
     if errors_encountered:
@@ -203,6 +1035,29 @@ if __name__ == "__main__":
             print(link)
         print("-------------------")
 
+        check_choice = input("\nCheck which of these links are alive? (yes/no) [no]: ").strip().lower()
+        if check_choice in ('yes', 'y'):
+            print(f"Checking {len(unique_found_links)} links ({LINK_CHECK_WORKERS} at a time, {LINK_CHECK_PER_HOST} per host)...")
+            check_results = check_links(unique_found_links)
+            dead_links = [result for result in check_results.values() if not result['alive']]
+            print(f"\n--- Link Check: {len(check_results) - len(dead_links)} alive, {len(dead_links)} dead ---")
+            for result in dead_links:
+                print(f"- {result['link']} ({result['status'] or result['error']})")
+            print("-------------------")
+
+            check_save_choice = input("\nDo you want to save the link check results to a CSV file? (yes/no): ").lower().strip()
+            if check_save_choice in ['yes', 'y']:
+                input_filename_base = os.path.splitext(os.path.basename(url_file_path))[0]
+                default_filename = f"{input_filename_base}_link_check_{datetime.datetime.now():%Y%m%d_%H%M%S}.csv"
+                output_filename = input(f"Enter filename to save as (leave blank for default: '{default_filename}'): ").strip()
+                if not output_filename:
+                    output_filename = default_filename
+                success, save_error = save_link_check_results_to_file(output_filename, check_results)
+                if success:
+                    print("Link check results saved successfully.")
+                else:
+                    print(save_error)
+
         while True:
             save_choice = input("\nDo you want to save these unique links to a text file? (yes/no): ").lower().strip()
             if save_choice in ['yes', 'y']:
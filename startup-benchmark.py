@@ -0,0 +1,85 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Measures how long website-link-fetcher.py takes before it does anything useful:
+#  - import time: loading the script (without running its prompts) in a fresh python
+#  - time to first link: import + fetch_links_in_web_page for one URL, in a fresh python
+# every measurement runs in a new interpreter so module caches don't hide the cost.
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'website-link-fetcher.py')
+DEFAULT_URL = 'https://example.com'
+DEFAULT_RUNS = 5
+
+MEASURE_CODE = '''
+import importlib.util, json, sys, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location('website_link_fetcher', sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+result = {'import_seconds': imported - started}
+if len(sys.argv) > 2:
+    links, error = module.fetch_links_in_web_page(sys.argv[2])
+    result['first_link_seconds'] = time.perf_counter() - started
+    result['links'] = len(links or [])
+    result['error'] = error
+print(json.dumps(result))
+'''
+
+
+def measure(url=None):
+    """
+    Run one measurement in a fresh interpreter. Returns (result dict, None), or (None, error
+    message) when the run failed, e.g. because the script could not be imported there.
+    """
+    command = [sys.executable, '-c', MEASURE_CODE, SCRIPT_PATH]
+    if url:
+        command.append(url)
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        stderr_lines = completed.stderr.strip().splitlines()
+        return None, stderr_lines[-1] if stderr_lines else f"exit code {completed.returncode}"
+    return json.loads(completed.stdout.strip().splitlines()[-1]), None
+
+
+def describe(label, values):
+    print(f"{label}: min {min(values):.3f}s, median {statistics.median(values):.3f}s, max {max(values):.3f}s ({len(values)} runs)")
+
+
+if __name__ == '__main__':
+    url = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_URL
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RUNS
+
+    print(f"--- startup benchmark for {os.path.basename(SCRIPT_PATH)} ---\n")
+
+    import_times = []
+    for run in range(runs):
+        result, error = measure()
+        if error:
+            print(f"import run {run + 1} failed: {error}")
+            continue
+        import_times.append(result['import_seconds'])
+    if import_times:
+        describe("import time", import_times)
+    if len(import_times) < runs:
+        print(f"{runs - len(import_times)} of {runs} import runs failed")
+
+    # the first fetch may still have to resolve the chromedriver, later ones reuse the cached path
+    first_link_times = []
+    for run in range(runs):
+        result, error = measure(url)
+        if error:
+            print(f"run {run + 1} failed: {error}")
+            continue
+        if result['error']:
+            print(f"run {run + 1}: {result['error']}")
+            continue
+        print(f"run {run + 1}: {result['first_link_seconds']:.3f}s, {result['links']} links")
+        first_link_times.append(result['first_link_seconds'])
+    if first_link_times:
+        describe(f"time to first link ({url})", first_link_times)
+    if len(first_link_times) < runs:
+        print(f"{runs - len(first_link_times)} of {runs} runs did not get to a first link")
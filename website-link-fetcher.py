@@ -1,18 +1,52 @@
-import msvcrt
+try:
+    import msvcrt  # windows only, used for "press any key"
+except ImportError:
+    msvcrt = None
+
 import os
 import re
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import datetime
 import sys
+import json
+import time
+
+# selenium, webdriver_manager and bs4 are slow to import, so they are only imported
+# inside fetch_links_in_web_page once there is actually a page to fetch
+
+# the chromedriver path found by webdriver-manager is remembered between runs, so
+# quick lookups don't start with a network round trip to check driver versions
+DRIVER_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.website-link-fetcher-driver.json')
+DRIVER_CACHE_MAX_AGE = 7 * 24 * 60 * 60  # seconds before asking webdriver-manager again
+
+
+def get_chromedriver_path(refresh=False):
+    """
+    Return the path to a chromedriver matching the installed Chrome. The path resolved by
+    webdriver-manager is cached in DRIVER_CACHE_FILE and reused for DRIVER_CACHE_MAX_AGE
+    seconds as long as the file still exists; refresh=True forces a new lookup.
+    """
+    if not refresh:
+        try:
+            with open(DRIVER_CACHE_FILE, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if time.time() - cached['resolved_at'] < DRIVER_CACHE_MAX_AGE and os.path.isfile(cached['path']):
+                return cached['path']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # no usable cache, resolve below
 
-# --- NEW IMPORTS ---
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, WebDriverException
-# --- END NEW IMPORTS ---
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    # Suppress webdriver-manager logs
+    os.environ['WDM_LOG_LEVEL'] = '0'
+    driver_path = ChromeDriverManager().install()
+
+    try:
+        with open(DRIVER_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'path': driver_path, 'resolved_at': time.time()}, f)
+    except OSError:
+        pass  # caching is only an optimization
+    return driver_path
 
 
 def fetch_links_in_web_page(url, text_pattern=None, use_regex=False, timeout=20):
@@ -26,6 +60,15 @@ def fetch_links_in_web_page(url, text_pattern=None, use_regex=False, timeout=20)
 
     Returns (links_list, error_message)
     """
+    try:
+        from bs4 import BeautifulSoup
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+    except ImportError as e:
+        return None, f"Error: a required package is missing ({e}). Install it with: pip install selenium webdriver-manager beautifulsoup4"
+
     links = set()
     driver = None  # Initialize driver for the 'finally' block
 
@@ -39,13 +82,12 @@ def fetch_links_in_web_page(url, text_pattern=None, use_regex=False, timeout=20)
         # Use a modern user agent
         chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
         
-        # Suppress webdriver-manager logs
-        os.environ['WDM_LOG_LEVEL'] = '0' 
-        
-        # Use webdriver-manager to automatically get the correct driver
-        driver_service = Service(ChromeDriverManager().install())
-        
-        driver = webdriver.Chrome(service=driver_service, options=chrome_options)
+        # Use webdriver-manager to automatically get the correct driver (cached between runs)
+        try:
+            driver = webdriver.Chrome(service=Service(get_chromedriver_path()), options=chrome_options)
+        except WebDriverException:
+            # the cached driver may no longer match an updated Chrome, look it up again
+            driver = webdriver.Chrome(service=Service(get_chromedriver_path(refresh=True)), options=chrome_options)
         
         # Set the timeout for the page *load*
         driver.set_page_load_timeout(timeout)